@@ -4,11 +4,10 @@ import zipfile
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-import matplotlib.pyplot as plt
 
 # Імпорти
 from data_loader import load_excels, get_row_bounds, slice_range
-from classification import classify_questions, QuestionType
+from classification import classify_questions
 from summary import build_all_summaries
 
 from excel_export import build_excel_report
@@ -73,15 +72,7 @@ def get_label(code, summary_map):
 def get_chart_fig(qs, df_data=None, title=None):
     data = df_data if df_data is not None else qs.table
     if data.empty: return None
-    is_scale = (qs.question.qtype == QuestionType.SCALE)
-    if not is_scale:
-        try:
-            vals = pd.to_numeric(data["Варіант відповіді"], errors='coerce')
-            if vals.notna().all() and vals.min() >= 0 and vals.max() <= 10:
-                is_scale = True
-        except: pass
-
-    if is_scale:
+    if qs.is_scale:
         fig = px.bar(data, x="Варіант відповіді", y="Кількість", text="Кількість", title=title)
         fig.update_traces(textposition='outside')
         fig.update_layout(xaxis_type='category')
@@ -133,7 +124,7 @@ if st.session_state.processed and st.session_state.sliced is not None:
                 if filter1_qs and filter1_qs.question.text in sliced.columns:
                     vals1 = [x for x in sliced[filter1_qs.question.text].unique() if pd.notna(x)]
                     try: vals1.sort() 
-                    except: pass
+                    except TypeError: pass  # змішані типи значень
                     filter1_val = st.selectbox("Значення 1:", vals1, key="f1_v")
 
             use_filter2 = st.checkbox("+ Додати другий критерій")
@@ -147,7 +138,7 @@ if st.session_state.processed and st.session_state.sliced is not None:
                     if filter2_qs and filter2_qs.question.text in sliced.columns:
                         vals2 = [x for x in sliced[filter2_qs.question.text].unique() if pd.notna(x)]
                         try: vals2.sort()
-                        except: pass
+                        except TypeError: pass  # змішані типи значень
                         filter2_val = st.selectbox("Значення 2:", vals2, key="f2_v")
             st.divider()
             target_code = st.selectbox("Питання для аналізу:", options=question_codes, format_func=lambda x: get_label(x, summary_map), key="target_q")
@@ -199,16 +190,14 @@ if st.session_state.processed and st.session_state.sliced is not None:
 
         @st.cache_data(show_spinner=False)
         def get_zip_archive(_ld, _sl, _qi, _sm, _ri):
-            plt.close('all') 
             buf = io.BytesIO()
             with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
                 zf.writestr("results.xlsx", build_excel_report(_ld, _sl, _qi, _sm, _ri))
-                plt.close('all') 
                 zf.writestr("results.pdf", build_pdf_report(_ld, _sl, _sm, _ri))
-                plt.close('all') 
-                zf.writestr("results.docx", build_docx_report(_ld, _sl, _sm, _ri))
-                plt.close('all') 
-                zf.writestr("results.pptx", build_pptx_report(_ld, _sl, _sm, _ri))
+                with zf.open("results.docx", "w") as f:
+                    build_docx_report(_ld, _sl, _sm, _ri, out=f)
+                with zf.open("results.pptx", "w") as f:
+                    build_pptx_report(_ld, _sl, _sm, _ri, out=f)
             return buf.getvalue()
 
         st.markdown("Оберіть формат для завантаження: 👇")
@@ -0,0 +1,313 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import stat
+import tempfile
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from summary import QuestionSummary
+
+PARALLEL_MIN_CHARTS = 8     # з якої кількості різних діаграм варто піднімати пул процесів
+
+BAR_WIDTH = 0.6
+BAR_COLOR = '#4F81BD'
+PIE_COLORS = ['#4F81BD', '#C0504D', '#9BBB59', '#8064A2', '#4BACC6', '#F79646']
+
+
+@dataclass(frozen=True)
+class ChartStyle:
+    """
+    Параметри растрової діаграми, якими відрізняються звіти (PDF, DOCX).
+    """
+    dpi: int = 150
+    font_size: int = 10
+    font_family: str = 'DejaVu Sans'        # конкретна гарнітура (з кирилицею), без пошуку за списком
+    bar_figsize: Tuple[float, float] = (6.0, 4.0)
+    pie_figsize: Tuple[float, float] = (6.0, 4.0)
+    pie_radius: float = 1.0
+    legend_font_size: int = 9
+    legend_two_cols_from: int = 4           # з якої кількості варіантів легенда у 2 стовпці
+
+
+@lru_cache(maxsize=1024)
+def wrap_label(label: str) -> str:
+    # Однакові варіанти (Так/Ні, шкали) повторюються в багатьох питаннях
+    return textwrap.fill(label, 25)
+
+
+def chart_payload(qs: QuestionSummary):
+    """
+    Готує дані діаграми у вигляді простих значень (придатних для передачі в інший процес).
+    :return: (labels, values, is_scale)
+    """
+    labels = qs.table["Варіант відповіді"].astype(str).tolist()
+    values = qs.table["Кількість"].to_numpy(dtype=np.float64)
+    return labels, values, qs.is_scale
+
+
+# Фігури створюються один раз на стиль і перевикористовуються для всіх діаграм;
+# rcParams під час малювання глобальні, тому малювання йде під замком
+_AXES: Dict[tuple, object] = {}
+_LOCK = threading.Lock()
+
+
+# matplotlib імпортується лише під час першого рендеру (OO API з FigureCanvasAgg,
+# без pyplot і вибору бекенду): PPTX-звіт і підсумки без нього обходяться
+@lru_cache(maxsize=None)
+def _pie_stroke():
+    import matplotlib.patheffects as path_effects
+    return [path_effects.withStroke(linewidth=2, foreground='#333333')]
+
+
+def _axes_for(style: ChartStyle, is_scale: bool):
+    key = (style, is_scale)
+    ax = _AXES.get(key)
+    if ax is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=style.bar_figsize if is_scale else style.pie_figsize, dpi=style.dpi)
+        FigureCanvasAgg(fig)
+        ax = _AXES[key] = fig.add_subplot(111)
+    return ax
+
+
+def _legend_overflows(fig, ax) -> bool:
+    """
+    Розкладка під фігуру сталого розміру: tight_layout (з полями від типових значень,
+    бо фігура перевикористовується). Для кругової діаграми з довгою легендою (до 15
+    варіантів) tight_layout здається, і легенда виходить за нижній край.
+    :return: True, якщо легенда не вміщується у фігуру.
+    """
+    import matplotlib
+    import warnings
+
+    fig.subplots_adjust(**{k: matplotlib.rcParams[f'figure.subplot.{k}']
+                           for k in ('left', 'right', 'bottom', 'top')})
+    with warnings.catch_warnings():
+        # "Tight layout not applied" – такий випадок обробляє викликач
+        warnings.simplefilter('ignore', UserWarning)
+        fig.tight_layout()
+    legend = ax.get_legend()
+    return legend is not None and legend.get_window_extent(fig.canvas.get_renderer()).y0 < 0
+
+
+def render_chart_png(labels: List[str], values: np.ndarray, is_scale: bool, style: ChartStyle) -> bytes:
+    """
+    Малює стовпчикову (шкали) або кругову діаграму matplotlib-ом.
+    :return: PNG-байти.
+    """
+    import matplotlib
+
+    wrapped_labels = [wrap_label(l) for l in labels]
+    rc = {'font.size': style.font_size, 'font.family': style.font_family}
+
+    with _LOCK, matplotlib.rc_context(rc):
+        ax = _axes_for(style, is_scale)
+        ax.clear()
+
+        if is_scale:
+            bars = ax.bar(wrapped_labels, values, color=BAR_COLOR, width=BAR_WIDTH)
+            ax.set_ylabel('Кількість')
+            ax.grid(axis='y', linestyle='--', alpha=0.5)
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                        f'{int(height)}', ha='center', va='bottom', fontweight='bold')
+        else:
+            c_arg = PIE_COLORS[:len(values)] if len(values) <= len(PIE_COLORS) else None
+            wedges, texts, autotexts = ax.pie(
+                values, labels=None, autopct='%1.1f%%', startangle=90,
+                pctdistance=0.8, colors=c_arg, radius=style.pie_radius
+            )
+            for autotext in autotexts:
+                autotext.set_color('white')
+                autotext.set_weight('bold')
+                autotext.set_path_effects(_pie_stroke())
+
+            ax.axis('equal')
+            cols = 2 if len(labels) >= style.legend_two_cols_from else 1
+            ax.legend(wrapped_labels, loc="upper center", bbox_to_anchor=(0.5, 0.0), ncol=cols,
+                      frameon=False, fontsize=style.legend_font_size)
+
+        fig = ax.figure
+        if _legend_overflows(fig, ax):
+            # Як раніше: savefig обрізає зображення за межами всіх елементів, і висота
+            # зростає разом із легендою
+            img_stream = io.BytesIO()
+            fig.savefig(img_stream, format='png', dpi=style.dpi, bbox_inches='tight',
+                        pil_kwargs={'compress_level': 1})
+            return img_stream.getvalue()
+
+        # Усе вміщується у фігуру сталого розміру: растр Agg кодуємо в PNG напряму
+        # (RGB без альфа-каналу), оминаючи savefig
+        fig.canvas.draw()
+        img = Image.frombuffer('RGBA', fig.canvas.get_width_height(), fig.canvas.buffer_rgba(),
+                               'raw', 'RGBA', 0, 1).convert('RGB')
+
+    img_stream = io.BytesIO()
+    img.save(img_stream, 'PNG', compress_level=1)
+    return img_stream.getvalue()
+
+
+# PNG діаграм зберігаються й на диску, щоб повторна побудова звіту (інший діапазон рядків,
+# інший формат) не малювала ті самі діаграми знову. CHART_CACHE_VERSION збільшується
+# при будь-якій зміні вигляду діаграм.
+# Каталог окремий для кожного користувача і доступний лише йому (0o700): інакше інший
+# локальний користувач міг би підкласти PNG під передбачуване ім'я файлу.
+_CACHE_OWNER = os.getuid() if hasattr(os, "getuid") else None
+CHART_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(), f"survey_chart_cache-{_CACHE_OWNER if _CACHE_OWNER is not None else 'user'}")
+CHART_CACHE_VERSION = 4
+CHART_CACHE_MAX_FILES = 2000    # понад це найдавніше використані PNG видаляються
+
+
+def _cache_dir() -> Optional[str]:
+    """
+    :return: CHART_CACHE_DIR, якщо це справжній каталог поточного користувача без доступу
+             для інших; None – кеш не використовується.
+    """
+    try:
+        os.makedirs(CHART_CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(CHART_CACHE_DIR)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode):
+        return None  # символьне посилання або файл замість каталогу
+    if _CACHE_OWNER is not None and (st.st_uid != _CACHE_OWNER or st.st_mode & 0o077):
+        return None
+    return CHART_CACHE_DIR
+
+
+def _disk_cache_name(key: tuple) -> str:
+    import matplotlib
+
+    digest = hashlib.blake2b(
+        repr((CHART_CACHE_VERSION, matplotlib.__version__) + key).encode(), digest_size=16
+    ).hexdigest()
+    return f"{digest}.png"
+
+
+def load_cached_png(key: tuple) -> Optional[bytes]:
+    """
+    :param key: кортеж простих значень (str, int, bool, ChartStyle), що однозначно задає діаграму.
+    :return: PNG-байти з дискового кешу або None.
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, _disk_cache_name(key))
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # час зміни – час останнього використання (для витіснення)
+        return data
+    except OSError:
+        return None
+
+
+def _evict_cached_pngs(cache_dir: str) -> None:
+    # Лишаються 3/4 ліміту, щоб не перебирати каталог на кожен наступний запис
+    try:
+        entries = [e for e in os.scandir(cache_dir) if e.name.endswith(".png")]
+        if len(entries) <= CHART_CACHE_MAX_FILES:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - CHART_CACHE_MAX_FILES * 3 // 4]:
+            os.unlink(entry.path)
+    except OSError:
+        pass  # файл уже видалив інший процес
+
+
+def store_cached_png(key: tuple, data: bytes) -> None:
+    # Запис через тимчасовий файл і os.replace: інший процес не прочитає недописаний PNG
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(cache_dir, _disk_cache_name(key)))
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        return  # кеш необов'язковий: без нього діаграма просто малюється знову
+    _evict_cached_pngs(cache_dir)
+
+
+@lru_cache(maxsize=256)
+def _cached_chart_png(labels: tuple, values: tuple, is_scale: bool, style: ChartStyle) -> bytes:
+    key = (labels, values, is_scale, style)
+    data = load_cached_png(key)
+    if data is None:
+        data = render_chart_png(list(labels), np.asarray(values), is_scale, style)
+        store_cached_png(key, data)
+    return data
+
+
+def chart_png(qs: QuestionSummary, style: ChartStyle) -> bytes:
+    """
+    PNG діаграми питання. Однакові розподіли (Так/Ні, шкали з тими самими відповідями)
+    рендеряться один раз: результат кешується за вмістом і стилем.
+    """
+    labels, values, is_scale = chart_payload(qs)
+    return _cached_chart_png(tuple(labels), tuple(values.tolist()), is_scale, style)
+
+
+def _chart_png_or_none(labels: tuple, values: tuple, is_scale: bool, style: ChartStyle) -> Optional[bytes]:
+    try:
+        return _cached_chart_png(labels, values, is_scale, style)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _pool_context():
+    # Не fork: сесії Streamlit – окремі потоки, і дочірній процес успадкував би _LOCK,
+    # захоплений іншою сесією, та завис би на ньому назавжди. Процеси forkserver
+    # відгалужуються від чистого однопотокового сервера (charts у ньому вже імпортовано)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["charts"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def chart_pngs(summaries: List[QuestionSummary], style: ChartStyle) -> List[Optional[bytes]]:
+    """
+    PNG діаграм для всіх питань звіту. Різні діаграми рендеряться паралельно в пулі
+    процесів (кожна незалежна і впирається в CPU), однакові – один раз.
+    :return: список у порядку summaries; None – діаграму побудувати не вдалося.
+    """
+    keys = []
+    for qs in summaries:
+        labels, values, is_scale = chart_payload(qs)
+        keys.append((tuple(labels), tuple(values.tolist()), is_scale, style))
+    unique = list(dict.fromkeys(keys))
+
+    rendered = None
+    workers = min(os.cpu_count() or 1, len(unique))
+    if workers > 1 and len(unique) >= PARALLEL_MIN_CHARTS:
+        try:
+            chunksize = max(1, len(unique) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as ex:
+                rendered = list(ex.map(_chart_png_or_none, *zip(*unique), chunksize=chunksize))
+        except (OSError, BrokenProcessPool):
+            pass  # пул недоступний у цьому середовищі – рендеримо послідовно
+    if rendered is None:
+        rendered = [_chart_png_or_none(*key) for key in unique]
+
+    by_key = dict(zip(unique, rendered))
+    return [by_key[key] for key in keys]
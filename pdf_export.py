@@ -1,19 +1,11 @@
-import io
 import os
 import urllib.request
-import textwrap
 import tempfile
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from fpdf import FPDF
 
-from classification import QuestionType
-from summary import QuestionSummary
+from charts import ChartStyle, chart_pngs
 
 CHART_DPI = 150
-BAR_WIDTH = 0.6
 
 FONT_FILENAME = "Tinos-Regular.ttf"
 FONT_PATH = os.path.join(os.getcwd(), FONT_FILENAME)
@@ -41,59 +33,8 @@ class PDFReport(FPDF):
             self.set_font("Times", "B", 10)
             self.cell(0, 10, "Survey Report", ln=1, align='R')
 
-def create_chart_image(qs: QuestionSummary) -> io.BytesIO:
-    plt.close('all')
-    plt.clf()
-    plt.rcParams.update({
-        'font.size': 10,
-        'font.family': 'serif' 
-    })
-    
-    labels = qs.table["Варіант відповіді"].astype(str).tolist()
-    values = qs.table["Кількість"]
-    wrapped_labels = [textwrap.fill(l, 25) for l in labels]
-
-    is_scale = (qs.question.qtype == QuestionType.SCALE)
-    if not is_scale:
-        try:
-            vals = pd.to_numeric(qs.table["Варіант відповіді"], errors='coerce')
-            if vals.notna().all() and vals.min() >= 0 and vals.max() <= 10:
-                is_scale = True
-        except: pass
-
-    if is_scale:
-        fig = plt.figure(figsize=(6.0, 4.0))
-        bars = plt.bar(wrapped_labels, values, color='#4F81BD', width=BAR_WIDTH)
-        plt.ylabel('Кількість')
-        plt.grid(axis='y', linestyle='--', alpha=0.5)
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                     f'{int(height)}', ha='center', va='bottom', fontweight='bold')
-    else:
-        fig = plt.figure(figsize=(6.0, 4.0))
-        colors = ['#4F81BD', '#C0504D', '#9BBB59', '#8064A2', '#4BACC6', '#F79646']
-        c_arg = colors[:len(values)] if len(values) <= len(colors) else None
-        wedges, texts, autotexts = plt.pie(
-            values, labels=None, autopct='%1.1f%%', startangle=90,
-            pctdistance=0.8, colors=c_arg, radius=1.0
-        )
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_weight('bold')
-            import matplotlib.patheffects as path_effects
-            autotext.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#333333')])
-        
-        plt.axis('equal')
-        cols = 2 if len(labels) > 3 else 1
-        plt.legend(wrapped_labels, loc="upper center", bbox_to_anchor=(0.5, 0.0), ncol=cols, frameon=False, fontsize=8)
-
-    plt.tight_layout()
-    img_stream = io.BytesIO()
-    plt.savefig(img_stream, format='png', dpi=CHART_DPI, bbox_inches='tight')
-    plt.close(fig)
-    img_stream.seek(0)
-    return img_stream
+# Діаграми PDF: шрифт із засічками, як і текст звіту
+PDF_CHART_STYLE = ChartStyle(dpi=CHART_DPI, font_size=10, font_family='DejaVu Serif', legend_font_size=8)
 
 def build_pdf_report(original_df, sliced_df, summaries, range_info) -> bytes:
     ensure_font_exists()
@@ -130,9 +71,10 @@ def build_pdf_report(original_df, sliced_df, summaries, range_info) -> bytes:
     
     pdf.ln(5)
 
-    for qs in summaries:
-        if qs.table.empty: continue
-        
+    summaries = [qs for qs in summaries if not qs.table.empty]
+    images = chart_pngs(summaries, PDF_CHART_STYLE)
+
+    for qs, png in zip(summaries, images):
         title = f"{qs.question.code}. {qs.question.text}"
         title = title.replace('–', '-').replace('—', '-').replace('’', "'")
         
@@ -161,31 +103,33 @@ def build_pdf_report(original_df, sliced_df, summaries, range_info) -> bytes:
         pdf.cell(col_w2, 8, h2, border=1, ln=0)
         pdf.cell(col_w2, 8, h3, border=1, ln=1)
         
-        for row in qs.table.itertuples(index=False):
-            val_text = str(row[0])[:60].replace('–', '-').replace('—', '-').replace('’', "'")
+        for label, count, pct in qs.table.astype(str).to_numpy():
+            val_text = label[:60].replace('–', '-').replace('—', '-').replace('’', "'")
             
             # Якщо шрифт не завантажився, уникаємо кирилиці
             if not font_ok and not val_text.isascii():
                 val_text = "..."
 
             pdf.cell(col_w1, 8, val_text, border=1, ln=0)
-            pdf.cell(col_w2, 8, str(row[1]), border=1, ln=0)
-            pdf.cell(col_w2, 8, str(row[2]), border=1, ln=1)
+            pdf.cell(col_w2, 8, count, border=1, ln=0)
+            pdf.cell(col_w2, 8, pct, border=1, ln=1)
             
         pdf.ln(5)
 
         # Графік
-        try:
-            img = create_chart_image(qs)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                tmp.write(img.getvalue())
-                name = tmp.name
-            
-            pdf.image(name, w=140, x=35)
-            os.unlink(name)
-            pdf.ln(10)
-        except:
+        if png is None:
             pdf.cell(0, 10, "[Chart Error]", ln=1)
+        else:
+            try:
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
+                    tmp.write(png)
+                    name = tmp.name
+                
+                pdf.image(name, w=140, x=35)
+                os.unlink(name)
+                pdf.ln(10)
+            except Exception:
+                pdf.cell(0, 10, "[Chart Error]", ln=1)
 
         if pdf.get_y() > 240:
             pdf.add_page()
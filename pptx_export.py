@@ -1,165 +1,287 @@
 import io
-import textwrap
-import pandas as pd  
-import matplotlib
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
+import os
+import re
+import zipfile
+from functools import lru_cache
+import pptx
 
 from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
+from pptx.chart.data import CategoryChartData
 from pptx.dml.color import RGBColor
-from pptx.oxml.xmlchemy import OxmlElement
-from pptx.oxml.ns import qn
+from pptx.enum.chart import XL_CHART_TYPE, XL_LABEL_POSITION, XL_LEGEND_POSITION
+from pptx.enum.dml import MSO_LINE
+from pptx.util import Inches, Pt
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import PackageWriter, _ZipPkgWriter
 
-from classification import QuestionInfo, QuestionType
-from summary import QuestionSummary
-from typing import List
+from charts import BAR_COLOR, PIE_COLORS, chart_payload
+from classification import QuestionInfo
+from typing import BinaryIO, List, Optional
+from xml.sax.saxutils import escape
 
 LOGO_FILE = "logo2.png"
 UNIV_NAME = "Чернівецький національний університет імені Юрія Федьковича"
-CHART_DPI = 150
 FONT_SIZE_CHART = 11        
 FONT_SIZE_HEADER = 12 
 FONT_SIZE_DATA = 11   
-BAR_WIDTH = 0.6
-
-def set_table_grid_style(table):
-    tbl = table._tbl
-    tblPr = tbl.tblPr
-    tblStyle = tblPr.find(qn('a:tableStyleId'))
-    if tblStyle is None:
-        tblStyle = OxmlElement('a:tableStyleId')
-        tblPr.append(tblStyle)
-    tblStyle.text = '{5940675A-B579-460E-94D1-54222C63F5DA}'
-
-def create_chart_image(qs: QuestionSummary) -> io.BytesIO:
-    plt.close('all') 
-    plt.clf()
-    plt.rcParams.update({'font.size': FONT_SIZE_CHART})
-    
-    labels = qs.table["Варіант відповіді"].astype(str).tolist()
-    values = qs.table["Кількість"]
-    wrapped_labels = [textwrap.fill(l, 25) for l in labels]
-
-    is_scale = (qs.question.qtype == QuestionType.SCALE)
-    if not is_scale:
-        try:
-            vals = pd.to_numeric(qs.table["Варіант відповіді"], errors='coerce')
-            if vals.notna().all() and vals.min() >= 0 and vals.max() <= 10:
-                is_scale = True
-        except: pass
+
+# Геометрія слайда питання (обчислюється один раз, а не на кожен слайд)
+_TITLE_SIZE = Pt(32)
+_TITLE_SIZE_LONG = Pt(24)
+_TABLE_BOX = (Inches(0.5), Inches(2.0), Inches(4.5), Inches(0.8))  # left, top, width, height
+_TABLE_COL_WIDTHS = (Inches(2.5), Inches(1.0), Inches(1.0))
+_CHART_LEFT, _CHART_TOP, _CHART_WIDTH = Inches(5.2), Inches(2.0), Inches(4.6)
+_CHART_HEIGHT = Inches(4.0)
+
+# Оформлення нативних діаграм: ті самі кольори, що й у растрових діаграмах PDF/DOCX
+_CHART_FONT_SIZE = Pt(FONT_SIZE_CHART)
+_BAR_RGB = RGBColor.from_string(BAR_COLOR[1:])
+_PIE_RGB = [RGBColor.from_string(c[1:]) for c in PIE_COLORS]
+_GRID_RGB = RGBColor(0xD7, 0xD7, 0xD7)
+_WHITE = RGBColor(0xFF, 0xFF, 0xFF)
+
+# XML-шаблони клітинок таблиці: стиль задається один раз, у клітинку підставляється лише текст
+_CELL_P_TMPL = (
+    '<a:p><a:pPr algn="{algn}"><a:defRPr{bold} sz="{sz}"><a:solidFill><a:srgbClr val="000000"/>'
+    '</a:solidFill></a:defRPr></a:pPr>{{runs}}</a:p>'
+)
+_CELL_TMPL = (
+    '<a:tc><a:txBody><a:bodyPr/><a:lstStyle/>{p}</a:txBody>'
+    '<a:tcPr><a:solidFill><a:srgbClr val="{fill}"/></a:solidFill></a:tcPr></a:tc>'
+)
+_HEADER_CELL = _CELL_TMPL.format(
+    p=_CELL_P_TMPL.format(algn='ctr', bold=' b="1"', sz=FONT_SIZE_HEADER * 100), fill='DCDCDC')
+_DATA_LEFT_CELL = _CELL_TMPL.format(
+    p=_CELL_P_TMPL.format(algn='l', bold='', sz=FONT_SIZE_DATA * 100), fill='FFFFFF')
+_DATA_CENTER_CELL = _CELL_TMPL.format(
+    p=_CELL_P_TMPL.format(algn='ctr', bold='', sz=FONT_SIZE_DATA * 100), fill='FFFFFF')
+_CTRL_CHARS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+
+def _runs_xml(text: str) -> str:
+    # Керівні символи екрануються як у python-pptx (_xHHHH_). На відміну від cell.text,
+    # який ділить текст за \n на окремі абзаци (стиль отримував лише перший), \n та \v
+    # тут стають розривами рядка <a:br/> усередині одного оформленого абзацу
+    parts = []
+    for idx, chunk in enumerate(re.split("\n|\v", text)):
+        if idx > 0:
+            parts.append('<a:br/>')
+        if chunk:
+            chunk = _CTRL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group()), chunk)
+            parts.append(f'<a:r><a:t>{escape(chunk)}</a:t></a:r>')
+    return ''.join(parts)
+
+_TABLE_STYLE_ID = '{5940675A-B579-460E-94D1-54222C63F5DA}'  # "Table Grid" – чорні межі клітинок
+_TABLE_FRAME_TMPL = (
+    '<p:graphicFrame {nsdecls}><p:nvGraphicFramePr><p:cNvPr id="{id}" name="Table {name_id}"/>'
+    '<p:cNvGraphicFramePr><a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/>'
+    '</p:nvGraphicFramePr><p:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></p:xfrm>'
+    '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/table">'
+    '<a:tbl><a:tblPr firstRow="1" bandRow="1"><a:tableStyleId>{style}</a:tableStyleId></a:tblPr>'
+    '<a:tblGrid>{grid}</a:tblGrid>{rows}</a:tbl></a:graphicData></a:graphic></p:graphicFrame>'
+)
+
+@lru_cache(maxsize=None)
+def _header_cells_xml(header: tuple) -> str:
+    # Заголовок однаковий для всіх таблиць звіту – його клітинки збираються один раз
+    return ''.join(_HEADER_CELL.format(runs=_runs_xml(h)) for h in header)
+
+def add_table(slide, header: List[str], rows) -> None:
+    """
+    Додає на слайд таблицю (заголовок + рядки даних), зібрану як один XML-фрагмент:
+    рамка, сітка, стиль і всі клітинки розбираються одним викликом parse_xml
+    замість add_table і покрокового встановлення властивостей кожної клітинки.
+    :param rows: рядки даних, вже перетворені на str (наприклад, df.astype(str).to_numpy()).
+    """
+    trs = [_header_cells_xml(tuple(header))]
+    for row in rows:
+        trs.append(''.join(
+            (_DATA_CENTER_CELL if j > 0 else _DATA_LEFT_CELL).format(runs=_runs_xml(val))
+            for j, val in enumerate(row)
+        ))
+
+    # Висота ділиться між рядками порівну, останній рядок забирає залишок (як у python-pptx)
+    x, y, cx, cy = _TABLE_BOX
+    row_h = cy // len(trs)
+    heights = [row_h] * (len(trs) - 1) + [cy - row_h * (len(trs) - 1)]
+
+    shape_id = slide.shapes._next_shape_id
+    frame = parse_xml(_TABLE_FRAME_TMPL.format(
+        nsdecls=nsdecls('a', 'p'), id=shape_id, name_id=shape_id - 1,
+        x=x, y=y, cx=cx, cy=cy, style=_TABLE_STYLE_ID,
+        grid=''.join(f'<a:gridCol w="{w}"/>' for w in _TABLE_COL_WIDTHS),
+        rows=''.join(f'<a:tr h="{h}">{cells}</a:tr>' for h, cells in zip(heights, trs)),
+    ))
+    slide.shapes._spTree.insert_element_before(frame, 'p:extLst')
+
+def add_chart(slide, labels: List[str], values, is_scale: bool) -> None:
+    """
+    Додає на слайд нативну діаграму PowerPoint (векторну, з даними у вкладеному xlsx,
+    її можна редагувати): стовпчикову для шкал, кругову для решти питань.
+    """
+    data = CategoryChartData(number_format='0')
+    # python-pptx вставляє підписи в XML діаграми як є, а керівні символи там недопустимі
+    data.categories = [_CTRL_CHARS.sub(' ', label) for label in labels]
+    data.add_series('Кількість', [float(v) for v in values])
+    chart_type = XL_CHART_TYPE.COLUMN_CLUSTERED if is_scale else XL_CHART_TYPE.PIE
+    chart = slide.shapes.add_chart(
+        chart_type, _CHART_LEFT, _CHART_TOP, _CHART_WIDTH, _CHART_HEIGHT, data).chart
+    chart.font.size = _CHART_FONT_SIZE
+
+    plot = chart.plots[0]
+    plot.has_data_labels = True
+    data_labels = plot.data_labels
+    data_labels.font.bold = True
 
     if is_scale:
-        fig = plt.figure(figsize=(6.0, 4.5))
-        bars = plt.bar(wrapped_labels, values, color='#4F81BD', width=BAR_WIDTH)
-        plt.ylabel('Кількість')
-        plt.grid(axis='y', linestyle='--', alpha=0.5)
-        plt.xticks(rotation=0)
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                     f'{int(height)}', ha='center', va='bottom', fontweight='bold')
+        chart.has_legend = False
+        plot.vary_by_categories = False
+        plot.gap_width = 67  # стовпець займає 0.6 кроку, як у растрових діаграмах
+        fill = plot.series[0].format.fill
+        fill.solid()
+        fill.fore_color.rgb = _BAR_RGB
+        data_labels.show_value = True
+        data_labels.position = XL_LABEL_POSITION.OUTSIDE_END
+
+        value_axis = chart.value_axis
+        value_axis.has_major_gridlines = True
+        grid_line = value_axis.major_gridlines.format.line
+        grid_line.dash_style = MSO_LINE.DASH
+        grid_line.color.rgb = _GRID_RGB
+        value_axis.has_title = True
+        value_axis.axis_title.text_frame.text = 'Кількість'
     else:
-        fig = plt.figure(figsize=(6.0, 5.0))
-        colors = ['#4F81BD', '#C0504D', '#9BBB59', '#8064A2', '#4BACC6', '#F79646']
-        c_arg = colors[:len(values)] if len(values) <= len(colors) else None
-        
-        wedges, texts, autotexts = plt.pie(
-            values, labels=None, autopct='%1.1f%%', startangle=90,
-            pctdistance=0.8, colors=c_arg, radius=1.1,
-            textprops={'fontsize': FONT_SIZE_CHART}
-        )
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_weight('bold')
-            import matplotlib.patheffects as path_effects
-            autotext.set_path_effects([path_effects.withStroke(linewidth=2, foreground='#333333')])
-
-        plt.axis('equal')
-        cols = 2 if len(labels) > 2 else 1
-        plt.legend(wrapped_labels, loc="upper center", bbox_to_anchor=(0.5, 0.0), ncol=cols, frameon=False, fontsize=10)
-
-    plt.tight_layout()
-    img_stream = io.BytesIO()
-    plt.savefig(img_stream, format='png', dpi=CHART_DPI, bbox_inches='tight')
-    plt.close(fig) 
-    img_stream.seek(0)
-    return img_stream
-
-def build_pptx_report(original_df, sliced_df, summaries, range_info):
-    prs = Presentation()
-
-    # Слайд 1: Титул
-    slide = prs.slides.add_slide(prs.slide_layouts[0])
-    try:
-        slide.shapes.title.text = "Звіт про результати опитування"
-        slide.placeholders[1].text = f"Всього анкет: {len(original_df)}\nОброблено: {len(sliced_df)}\n{range_info}"
-    except: pass
+        chart.has_legend = True
+        chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+        chart.legend.include_in_layout = False
+        data_labels.show_value = False
+        data_labels.show_percentage = True
+        data_labels.number_format = '0.0%'
+        data_labels.number_format_is_linked = False
+        data_labels.position = XL_LABEL_POSITION.INSIDE_END
+        data_labels.font.color.rgb = _WHITE
+        # Більше секторів, ніж кольорів у палітрі, – лишаються кольори теми
+        if len(values) <= len(_PIE_RGB):
+            for point, rgb in zip(plot.series[0].points, _PIE_RGB):
+                point.format.fill.solid()
+                point.format.fill.fore_color.rgb = rgb
+
+_THANKS_TITLE = "Дякую за увагу!"
+_THANKS_TEXT = ("Створено за допомогою додатку студентки МПУіК - Каптар Діани. "
+                "Керівник проєкту – доцент Фратавчан Валерій Григорович.")
+
+@lru_cache(maxsize=None)
+def _template_bytes() -> bytes:
+    """
+    Заготовка звіту, зібрана один раз на процес: стандартний шаблон python-pptx
+    із титульним слайдом (без підзаголовка) і вже заповненим завершальним слайдом.
+    """
+    path = os.path.join(os.path.dirname(pptx.__file__), "templates", "default.pptx")
+    prs = Presentation(path)
+    _fill_title_slide(prs.slides.add_slide(prs.slide_layouts[0]), "Звіт про результати опитування", "")
+    _fill_title_slide(prs.slides.add_slide(prs.slide_layouts[0]), _THANKS_TITLE, _THANKS_TEXT)
+    output = io.BytesIO()
+    prs.save(output)
+    return output.getvalue()
+
+def _count_partnames(prs) -> None:
+    """
+    Package.next_partname перебирає всі частини пакета на кожен виклик (O(N²) на звіт).
+    Під час побудови частини лише додаються, тож зайняті імена збираються один раз
+    на шаблон, а далі номер просто збільшується до першого вільного.
+    """
+    package = prs.part.package
+    counters = {}
+
+    def next_partname(tmpl: str) -> PackURI:
+        state = counters.get(tmpl)
+        if state is None:
+            prefix = tmpl[: (tmpl % 42).find("42")]
+            taken = {p.partname for p in package.iter_parts() if p.partname.startswith(prefix)}
+            state = counters[tmpl] = [0, taken]
+        state[0] += 1
+        while tmpl % state[0] in state[1]:
+            state[0] += 1
+        return PackURI(tmpl % state[0])
+
+    package.next_partname = next_partname
+
+def _fill_title_slide(slide, title: str, subtitle: str) -> None:
+    """Заповнює заголовок і підзаголовок (placeholder idx=1), якщо вони є в макеті."""
+    if slide.shapes.title is not None:
+        slide.shapes.title.text = title
+    for placeholder in slide.placeholders:
+        if placeholder.placeholder_format.idx == 1:
+            placeholder.text = subtitle
+            break
+
+# Частини, що вже стиснені власним форматом: повторний deflate майже не зменшує їх
+_STORED_EXTS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'xlsx'})
+
+class _FastZipPkgWriter(_ZipPkgWriter):
+    """ZIP-запис PPTX: картинки й вкладені xlsx – без стиснення, XML – deflate рівня 1."""
+
+    def write(self, pack_uri: PackURI, blob: bytes) -> None:
+        if pack_uri.ext.lower() in _STORED_EXTS:
+            self._zipf.writestr(pack_uri.membername, blob, compress_type=zipfile.ZIP_STORED)
+        else:
+            self._zipf.writestr(pack_uri.membername, blob, compresslevel=1)
+
+class _FastPackageWriter(PackageWriter):
+    def _write(self) -> None:
+        with _FastZipPkgWriter(self._pkg_file) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+def _save(prs, out: BinaryIO) -> None:
+    # Те саме, що prs.save(out), але з _FastZipPkgWriter замість стандартного запису
+    package = prs.part.package
+    _FastPackageWriter.write(out, package._rels, tuple(package.iter_parts()))
+
+def build_pptx_report(original_df, sliced_df, summaries, range_info, out: Optional[BinaryIO] = None):
+    """
+    Формує PPTX-звіт.
+    :param out: файлоподібний об'єкт для запису; якщо не задано – повертаються байти.
+    """
+    prs = Presentation(io.BytesIO(_template_bytes()))
+    _count_partnames(prs)
+
+    # Слайд 1: Титул (із заготовки, лишається підставити підзаголовок)
+    _fill_title_slide(prs.slides[0], "Звіт про результати опитування",
+                      f"Всього анкет: {len(original_df)}\nОброблено: {len(sliced_df)}\n{range_info}")
 
     # Слайди даних
     layout_index = 5 
     if len(prs.slide_layouts) <= 5: layout_index = len(prs.slide_layouts) - 1
-    
+    layout = prs.slide_layouts[layout_index]
+
     for qs in summaries:
         if qs.table.empty: continue
-        
-        slide = prs.slides.add_slide(prs.slide_layouts[layout_index])
-        
-        try:
-            title = slide.shapes.title
-            title.text = f"{qs.question.code}. {qs.question.text}"
-            if len(title.text) > 60: title.text_frame.paragraphs[0].font.size = Pt(24)
-            else: title.text_frame.paragraphs[0].font.size = Pt(32)
-        except: pass
+        slide = prs.slides.add_slide(layout)
+
+        title = slide.shapes.title
+        if title is not None:
+            title_text = f"{qs.question.code}. {qs.question.text}"
+            title.text = title_text
+            para = title.text_frame.paragraphs[0]
+            para.font.size = _TITLE_SIZE_LONG if len(title_text) > 60 else _TITLE_SIZE
 
         # Таблиця
-        rows = len(qs.table) + 1
-        cols = 3
-        table = slide.shapes.add_table(rows, cols, Inches(0.5), Inches(2.0), Inches(4.5), Inches(0.8)).table
-        set_table_grid_style(table)
-
-        table.columns[0].width = Inches(2.5)
-        table.columns[1].width = Inches(1.0)
-        table.columns[2].width = Inches(1.0)
-
-        # Header
-        headers = ["Варіант", "Кільк.", "%"]
-        for i, h in enumerate(headers):
-            cell = table.cell(0, i)
-            cell.text = h
-            cell.text_frame.paragraphs[0].font.bold = True
-            cell.text_frame.paragraphs[0].font.size = Pt(FONT_SIZE_HEADER)
-            cell.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-            cell.fill.solid()
-            cell.fill.fore_color.rgb = RGBColor(220, 220, 220)
-            cell.text_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
-
-        # Data
-        for i, row in enumerate(qs.table.itertuples(index=False)):
-            for j, val in enumerate(row):
-                cell = table.cell(i+1, j)
-                cell.text = str(val)
-                cell.text_frame.paragraphs[0].font.size = Pt(FONT_SIZE_DATA)
-                cell.text_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
-                if j > 0: cell.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-                else: cell.text_frame.paragraphs[0].alignment = PP_ALIGN.LEFT
-                cell.fill.solid()
-                cell.fill.fore_color.rgb = RGBColor(255, 255, 255)
-
-        # Chart
-        try:
-            img_stream = create_chart_image(qs)
-            slide.shapes.add_picture(img_stream, Inches(5.2), Inches(2.0), width=Inches(4.6))
-        except: pass
-
-    slide = prs.slides.add_slide(prs.slide_layouts[0])
-    try:
-        slide.shapes.title.text = "Дякую за увагу!"
-        slide.placeholders[1].text = f"Створено за допомогою додатку студентки МПУіК - Каптар Діани. Керівник проєкту – доцент Фратавчан Валерій Григорович."
-
-    except: pass
+        add_table(slide, ["Варіант", "Кільк.", "%"], qs.table.astype(str).to_numpy())
+
+        # Діаграма
+        add_chart(slide, *chart_payload(qs))
+
+    # Завершальний слайд уже є в заготовці другим – переносимо його в кінець
+    sld_id_lst = prs.slides._sldIdLst
+    sld_id_lst.append(sld_id_lst[1])
+
+    if out is not None:
+        _save(prs, out)
+        return None
 
     output = io.BytesIO()
-    prs.save(output)
-    return output.getvalue()
\ No newline at end of file
+    _save(prs, output)
+    return output.getvalue()
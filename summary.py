@@ -1,13 +1,30 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List
+import numpy as np
 import pandas as pd
+from pandas.api.types import infer_dtype
 from classification import QuestionInfo, QuestionType
 
 @dataclass
 class QuestionSummary:
     question: QuestionInfo
     table: pd.DataFrame  # колонки: ["Варіант відповіді", "Кількість", "%"]
+    is_scale: bool = False  # діаграма – стовпчикова (шкала), інакше кругова
+
+
+def is_numeric_scale(labels: List[str]) -> bool:
+    """Чи всі варіанти відповіді – числа в межах 0–10 (один прохід, зупинка на першому невідповідному)."""
+    if not labels:
+        return False
+    for label in labels:
+        try:
+            v = float(label)
+        except ValueError:
+            return False
+        if not 0 <= v <= 10:
+            return False
+    return True
 
 
 def _build_summary_for_series(
@@ -22,19 +39,55 @@ def _build_summary_for_series(
         table = pd.DataFrame(columns=["Варіант відповіді", "Кількість", "%"])
         return QuestionSummary(question=question, table=table)
 
-    counts = v.astype(str).str.strip().value_counts().sort_index()
-    total = counts.sum()
-    perc = (counts / total * 100).round(1)
+    if question.qtype == QuestionType.SCALE and v.dtype.kind in "iu" and v.min() >= 0:
+        # Цілочисельна шкала: кількості дає bincount, без хешування значень
+        bins = np.bincount(v.to_numpy(dtype=np.int64))
+        present = np.flatnonzero(bins)
+        answers = present.astype(str)
+        weights = bins[present]
+    elif v.dtype.kind == "f":
+        # Дробові рахуються за бітовим поданням: -0.0 і 0.0 рівні при порівнянні,
+        # але дають різний текст. Унікальні значення перетворюються в текст
+        # у вихідному dtype (float32 в індексі value_counts став би float64)
+        arr = v.to_numpy(dtype=getattr(v.dtype, "numpy_dtype", v.dtype))
+        bits, weights = np.unique(arr.view(f"u{arr.itemsize}"), return_counts=True)
+        answers = pd.Series(bits.view(arr.dtype), dtype=v.dtype).astype(str).to_numpy(dtype=object)
+    elif (v.dtype.kind in "biu" or isinstance(v.dtype, pd.StringDtype)
+            or infer_dtype(v, skipna=False) == "string"):
+        # Цілі й рядки (зокрема object-стовпці лише з str) рахуються як є, а в текст
+        # перетворюються лише унікальні значення: рівні значення дають однаковий текст
+        raw = v.value_counts(sort=False)
+        answers = raw.index.astype(str).to_numpy(dtype=object)
+        weights = raw.to_numpy()
+    else:
+        # object-стовпці зі змішаними типами (1, 1.0, True рівні при хешуванні) – поелементно
+        answers = v.astype(str).to_numpy(dtype=object)
+        weights = None
+
+    # np.unique повертає варіанти вже відсортованими
+    labels, inverse = np.unique(answers, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights, minlength=len(labels))
+
+    # Пробіли по краях шукаються лише серед різних варіантів; якщо вони є,
+    # однаковий після strip текст зливається повторним np.unique.
+    # Масиви object, не str: dtype 'U' відкидає NUL у кінці рядка ('a\x00' -> 'a')
+    stripped = np.array([label.strip() for label in labels], dtype=object)
+    if (stripped != labels).any():
+        labels, inverse = np.unique(stripped, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts, minlength=len(labels))
+    counts = counts.astype(np.int64)
+    perc = np.round(counts / counts.sum() * 100, 1)
+    is_scale = question.qtype == QuestionType.SCALE or is_numeric_scale(labels.tolist())
 
     table = pd.DataFrame(
         {
-            "Варіант відповіді": counts.index,
-            "Кількість": counts.values,
-            "%": perc.values,
+            "Варіант відповіді": labels,
+            "Кількість": counts,
+            "%": perc,
         }
     )
 
-    return QuestionSummary(question=question, table=table)
+    return QuestionSummary(question=question, table=table, is_scale=is_scale)
 
 
 def build_all_summaries(
@@ -0,0 +1,43 @@
+import io
+import unittest
+
+import numpy as np
+from PIL import Image
+
+import charts
+from charts import ChartStyle, render_chart_png
+
+# Ті самі параметри, що PDF_CHART_STYLE і DOCX_CHART_STYLE (їхні модулі потребують fpdf/python-docx)
+PDF_STYLE = ChartStyle(dpi=150, font_size=10, font_family='DejaVu Serif', legend_font_size=8)
+DOCX_STYLE = ChartStyle(dpi=150, font_size=10, legend_font_size=9)
+
+
+def _labels(n):
+    return [f'Варіант відповіді номер {i}, сформульований розлого і з поясненням' for i in range(n)]
+
+
+class PieLegendTest(unittest.TestCase):
+    def _render(self, n, style):
+        png = render_chart_png(_labels(n), np.arange(1, n + 1, dtype=np.float64), False, style)
+        return np.asarray(Image.open(io.BytesIO(png)).convert('RGB'))
+
+    def test_short_legend_fits_fixed_size(self):
+        for style in (PDF_STYLE, DOCX_STYLE):
+            img = self._render(3, style)
+            self.assertEqual(img.shape[:2], (600, 900))
+            ax = charts._axes_for(style, False)
+            extent = ax.get_legend().get_window_extent(ax.figure.canvas.get_renderer())
+            self.assertGreaterEqual(extent.y0, 0)
+
+    def test_fifteen_options_legend_not_cut(self):
+        for style in (PDF_STYLE, DOCX_STYLE):
+            img = self._render(15, style)
+            # Зображення росте разом із легендою, і її нижній рядок не обрізано
+            self.assertGreater(img.shape[0], 600)
+            self.assertTrue((img[-2:] == 255).all())
+            dark_rows = np.flatnonzero((img < 128).all(axis=2).any(axis=1))
+            self.assertGreater(dark_rows[-1], img.shape[0] * 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
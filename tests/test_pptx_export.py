@@ -0,0 +1,26 @@
+import io
+import unittest
+
+from pptx import Presentation
+
+from pptx_export import add_chart
+
+
+class AddChartTest(unittest.TestCase):
+    def test_control_characters_in_labels(self):
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        labels = ['a\x01b', 'c\x0bd', 'e\nf', 'g\x1f']
+
+        for is_scale in (True, False):
+            add_chart(slide, labels, [1.0, 2.0, 3.0, 4.0], is_scale)
+
+        out = io.BytesIO()
+        prs.save(out)
+        charts = [s.chart for s in Presentation(out).slides[0].shapes if s.has_chart]
+        self.assertEqual(len(charts), 2)
+        self.assertEqual(list(charts[0].plots[0].categories), ['a b', 'c d', 'e\nf', 'g '])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from classification import QuestionInfo, QuestionType
+from summary import _build_summary_for_series
+
+
+def _baseline_table(series):
+    # Попередній спосіб: кожна відповідь у текст, strip, value_counts, сортування
+    counts = series.dropna().astype(str).str.strip().value_counts().sort_index()
+    perc = (counts / counts.sum() * 100).round(1)
+    return pd.DataFrame(
+        {
+            "Варіант відповіді": counts.index,
+            "Кількість": counts.values,
+            "%": perc.values,
+        }
+    )
+
+
+class SummaryMatchesBaselineTest(unittest.TestCase):
+    CASES = {
+        "int": pd.Series([3, 1, 2, 3, 10, 1, 3]),
+        "Int64": pd.Series([2, None, 5, 2, 11, None], dtype="Int64"),
+        "float_nan": pd.Series([1.5, np.nan, 2.0, 1.5, 0.1, np.nan, 100.25]),
+        "float_zeros": pd.Series([0.0, -0.0, 0.0, 1.0, -0.0]),
+        "float32": pd.Series([0.1, 0.1, 2.5, -0.0], dtype="float32"),
+        "Float64": pd.Series([0.5, None, 0.5, -0.0, 0.0], dtype="Float64"),
+        "str_edges": pd.Series(["Так", " Так", "Так ", "Ні", "\tНі\n", None, "Не знаю"]),
+        "mixed_object": pd.Series([1, 1.0, True, "1", " 1", None, "Так"], dtype=object),
+        "whitespace_only": pd.Series(["", " ", "\t", "a", "  "]),
+        "string": pd.Series(["b", " a", "a", None, "b "], dtype="string"),
+        "nul": pd.Series(["a", "a\x00", "a", "b\x00", None]),
+        "nul_object": pd.Series(["a\x00", 1, "a", 1.0], dtype=object),
+    }
+
+    def test_matches_baseline(self):
+        for qtype in (QuestionType.CATEGORICAL, QuestionType.BINARY, QuestionType.SCALE):
+            for name, series in self.CASES.items():
+                with self.subTest(case=name, qtype=qtype.name):
+                    qs = _build_summary_for_series(series, QuestionInfo("Q1", "Питання", qtype))
+                    expected = _baseline_table(series)
+                    got = qs.table
+                    self.assertEqual(got["Варіант відповіді"].tolist(), expected["Варіант відповіді"].tolist())
+                    self.assertEqual(got["Кількість"].tolist(), expected["Кількість"].tolist())
+                    self.assertEqual(got["%"].tolist(), expected["%"].tolist())
+                    for col in expected.columns:
+                        self.assertEqual(got[col].dtype, expected[col].dtype, col)
+
+
+class ScaleBincountTest(unittest.TestCase):
+    def _summary(self, series):
+        return _build_summary_for_series(series, QuestionInfo("Q1", "Оцініть від 1 до 5", QuestionType.SCALE))
+
+    def test_int64_with_na(self):
+        qs = self._summary(pd.Series([5, None, 4, 5, 1, None, 5, 4], dtype="Int64"))
+        self.assertEqual(qs.table["Варіант відповіді"].tolist(), ["1", "4", "5"])
+        self.assertEqual(qs.table["Кількість"].tolist(), [1, 2, 3])
+        self.assertEqual(qs.table["%"].tolist(), [16.7, 33.3, 50.0])
+        self.assertTrue(qs.is_scale)
+
+    def test_scale_with_gaps(self):
+        # Варіантів 2 і 4 ніхто не обрав – у таблиці їх немає, як і раніше
+        qs = self._summary(pd.Series([1, 3, 5, 5, 3, 1, 1, 5, 5]))
+        self.assertEqual(qs.table["Варіант відповіді"].tolist(), ["1", "3", "5"])
+        self.assertEqual(qs.table["Кількість"].tolist(), [3, 2, 4])
+        self.assertEqual(qs.table["%"].tolist(), [33.3, 22.2, 44.4])
+        self.assertTrue(qs.is_scale)
+
+    def test_ten_point_scale_sorted_as_text(self):
+        qs = self._summary(pd.Series([10, 2, 0, 10]))
+        self.assertEqual(qs.table["Варіант відповіді"].tolist(), ["0", "10", "2"])
+        self.assertEqual(qs.table["Кількість"].tolist(), [1, 2, 1])
+        self.assertEqual(qs.table["%"].tolist(), [25.0, 50.0, 25.0])
+        self.assertTrue(qs.is_scale)
+
+
+if __name__ == '__main__':
+    unittest.main()